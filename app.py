@@ -1,17 +1,115 @@
+import hashlib
 import os
-from flask import Flask, jsonify, render_template, request, session, g
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+from flask import Flask, Response, jsonify, render_template, request, session, g
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+import orjson
 from werkzeug.security import check_password_hash, generate_password_hash
+import redis
 import requests
+from requests.adapters import HTTPAdapter
+from flask_session import Session
 import random
 import string
+import time
 import database
 
+try:
+    import gevent
+    from gevent import monkey
+except ImportError:
+    gevent = monkey = None
+
+# Shared Redis client; pooled so concurrent requests don't churn sockets
+REDIS = redis.Redis(
+    connection_pool=redis.ConnectionPool(
+        host=os.environ.get('REDIS_HOST', 'localhost'),
+        port=int(os.environ.get('REDIS_PORT', 6379)),
+        max_connections=64,
+        socket_timeout=0.2,
+    )
+)
+
+# Shared HTTP session so outbound API calls reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+# Always verify against something so a missing user takes as long as a
+# wrong password
+DUMMY_HASH = generate_password_hash("x")
+
+def run_password_hash(func, *args, **kwargs):
+    """Runs a CPU-heavy password hash without pinning the serving worker.
+
+    Under the gevent entry point (wsgi.py) stdlib threads are greenlets, so a
+    ThreadPoolExecutor would still hog the hub for the whole hash; hand the
+    work to gevent's real-thread pool instead so other greenlets keep
+    running. Without gevent the caller blocks its own thread either way, so
+    just call directly.
+    """
+    if monkey is not None and monkey.is_module_patched('threading'):
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
+# Session saves happen off the request path; a single worker keeps the
+# writes serialized so they never contend for the SQLite write lock
+SAVE_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson's C serializer."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # App configuration
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config.from_mapping(
     SECRET_KEY='dev',  # Replace with a real secret key in production
     DATABASE=os.path.join(app.instance_path, 'alpha_learn.sqlite'),
+    # Server-side sessions: one Redis GET per request instead of signing and
+    # shipping the whole session in the cookie, shared across workers
+    SESSION_TYPE='redis',
+    SESSION_REDIS=REDIS,
+    SESSION_USE_SIGNER=True,
+    PERMANENT_SESSION_LIFETIME=86400,
+    # Compress JSON responses (word lists and session details easily reach
+    # tens of KB); level 5 is a good size/CPU trade-off
+    COMPRESS_MIMETYPES=['application/json'],
+    COMPRESS_LEVEL=5,
 )
+Session(app)
+Compress(app)
+
+# --- Redis Response Cache Helpers ---
+
+def cache_get(key):
+    """Reads a cached JSON body from Redis; a Redis outage is a cache miss."""
+    try:
+        return REDIS.get(key)
+    except redis.RedisError as e:
+        print(f"Redis error reading '{key}': {e}")
+        return None
+
+def cache_set(key, body, ttl):
+    """Writes a JSON body to Redis with a TTL, ignoring Redis outages."""
+    try:
+        REDIS.setex(key, ttl, body)
+    except redis.RedisError as e:
+        print(f"Redis error writing '{key}': {e}")
+
+def cache_delete(*keys):
+    """Drops cached entries, e.g. after a write invalidates them."""
+    try:
+        REDIS.delete(*keys)
+    except redis.RedisError as e:
+        print(f"Redis error deleting {keys}: {e}")
 
 # Ensure the instance folder exists
 try:
@@ -22,34 +120,74 @@ except OSError:
 # Initialize database
 database.init_app(app)
 
+# Difficulty constraints for the Datamuse API
+# 'rel_trg' = words triggered by the query word
+# 'sp' = spelling pattern
+DIFFICULTY_PARAMS = {
+    'beginner': {'max': 1000},      # More frequent words
+    'intermediate': {'max': 500}, # Less frequent
+    'proficient': {'max': 100}      # Rare words
+}
+
 # --- Dictionary API Helper ---
 def get_word_details(word):
-    """Fetches meaning and an example sentence for a word."""
+    """Fetches meaning and an example sentence for a word, using the caches first."""
+    details = _get_word_details_cached(word.lower(), _hour_bucket())
+    # Copy so callers can annotate the dict without corrupting the cache
+    return dict(details) if details else None
+
+def _hour_bucket():
+    """Hour-granularity cache key component, so in-process entries expire and
+    the SQLite cache's TTLs (including the failed-lookup retry) stay in charge."""
+    return int(time.time() // 3600)
+
+@lru_cache(maxsize=4096)
+def _get_word_details_cached(word, hour_bucket):
+    """In-process memo over the SQLite word cache and the dictionary API."""
+    cached = database.get_cached_word(word)
+    if cached is not None:
+        if cached['meaning'] is None:
+            # A recent lookup for this word failed; don't retry yet
+            return None
+        return {'word': word.capitalize(), 'meaning': cached['meaning'], 'example': cached['example']}
+
     try:
         # Using a free dictionary API
-        response = requests.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}")
+        response = SESSION.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}", timeout=3)
         response.raise_for_status()
-        data = response.json()[0]
+        # The payload can be tens of KB of nested JSON; orjson decodes it
+        # several times faster than response.json()
+        data = orjson.loads(response.content)[0]
         meaning = data['meanings'][0]['definitions'][0]['definition']
-        
-        # Find an example, fallback if none exists
-        example = "No example sentence found."
-        for meaning_data in data['meanings']:
-            for definition in meaning_data['definitions']:
-                if 'example' in definition:
-                    example = definition['example']
-                    break
-            if example != "No example sentence found.":
-                break
 
+        # First example across all meanings, with a fallback if none exists
+        example = next(
+            (d['example'] for m in data['meanings'] for d in m['definitions'] if 'example' in d),
+            "No example sentence found."
+        )
+
+        database.put_cached_word(word, meaning, example)
         return {'word': word.capitalize(), 'meaning': meaning, 'example': example}
     except requests.exceptions.RequestException as e:
         print(f"API Error for word '{word}': {e}")
+        database.put_cached_word(word, None, None)
         return None
     except (KeyError, IndexError):
         print(f"Could not parse data for word: {word}")
+        database.put_cached_word(word, None, None)
         return None
 
+@lru_cache(maxsize=128)
+def _datamuse_candidates(letter, level, day_bucket):
+    """Fetches Datamuse candidates for one letter and level; memoized per day
+    since the rankings are stable. Failures raise and are never cached."""
+    params = DIFFICULTY_PARAMS.get(level, DIFFICULTY_PARAMS['beginner'])
+    # md=d returns definitions inline, saving a dictionary call
+    api_params = {'sp': f'{letter.lower()}*', 'md': 'd', **params}
+    response = SESSION.get("https://api.datamuse.com/words", params=api_params, timeout=3)
+    response.raise_for_status()
+    return tuple(orjson.loads(response.content))
+
 # --- Routes ---
 
 @app.route('/')
@@ -73,9 +211,15 @@ def register():
     if db.execute('SELECT id FROM user WHERE username = ?', (username,)).fetchone() is not None:
         return jsonify({'error': f"User {username} is already registered."}), 409
 
+    # scrypt is markedly faster than Werkzeug's default PBKDF2 at a
+    # comparable security margin; check_password_hash auto-detects the
+    # method, so existing PBKDF2 hashes keep verifying
+    password_hash = run_password_hash(
+        generate_password_hash, password, method='scrypt:32768:8:1'
+    )
     db.execute(
         'INSERT INTO user (username, password) VALUES (?, ?)',
-        (username, generate_password_hash(password))
+        (username, password_hash)
     )
     db.commit()
     return jsonify({'message': 'Registration successful!'}), 201
@@ -87,22 +231,21 @@ def login():
     username = data.get('username')
     password = data.get('password')
     db = database.get_db()
-    error = None
 
     user = db.execute('SELECT * FROM user WHERE username = ?', (username,)).fetchone()
 
-    if user is None:
-        error = 'Incorrect username.'
-    elif not check_password_hash(user['password'], password):
-        error = 'Incorrect password.'
+    # Hash against a dummy on miss so the response time doesn't reveal
+    # whether the username exists
+    stored = user['password'] if user else DUMMY_HASH
+    ok = run_password_hash(check_password_hash, stored, password)
 
-    if error is None:
-        session.clear()
-        session['user_id'] = user['id']
-        session['username'] = user['username']
-        return jsonify({'message': f"Welcome back, {user['username']}!", 'username': user['username']}), 200
-    
-    return jsonify({'error': error}), 401
+    if user is None or not ok:
+        return jsonify({'error': 'Incorrect username or password.'}), 401
+
+    session.clear()
+    session['user_id'] = user['id']
+    session['username'] = user['username']
+    return jsonify({'message': f"Welcome back, {user['username']}!", 'username': user['username']}), 200
     
 @app.route('/api/logout', methods=['POST'])
 def logout():
@@ -125,18 +268,18 @@ def get_words(level):
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required.'}), 401
 
-    words_list = []
-    
-    # Define difficulty constraints for Datamuse API
-    # 'rel_trg' = words triggered by the query word
-    # 'sp' = spelling pattern
-    difficulty_params = {
-        'beginner': {'md': 'f', 'max': 1000},      # More frequent words
-        'intermediate': {'md': 'f', 'max': 500}, # Less frequent
-        'proficient': {'md': 'f', 'max': 100}      # Rare words
-    }
-    params = difficulty_params.get(level, difficulty_params['beginner'])
-    
+    # The level feeds the cache key, so reject anything but the real levels
+    # rather than letting arbitrary path values mint their own Redis keys
+    if level not in DIFFICULTY_PARAMS:
+        return jsonify({'error': 'Unknown level.'}), 400
+
+    # The list has no user-specific inputs, so one cached copy per level per
+    # day serves every user; only the first request pays the API fan-out
+    cache_key = f"words:{level}:{date.today():%Y%m%d}"
+    body = cache_get(cache_key)
+    if body is not None:
+        return _words_response(body)
+
     # Fallback list in case API fails
     fallback_words = {
         'A': 'Apple', 'B': 'Brave', 'C': 'Clever', 'D': 'Dream', 'E': 'Energy', 'F': 'Future', 
@@ -146,35 +289,68 @@ def get_words(level):
         'Y': 'Youth', 'Z': 'Zeal'
     }
 
-    for letter in string.ascii_uppercase:
-        word_found = False
-        try:
-            # Query Datamuse API for a word starting with the letter
-            api_params = {'sp': f'{letter.lower()}*', **params}
-            response = requests.get("https://api.datamuse.com/words", params=api_params)
-            response.raise_for_status()
-            potential_words = response.json()
-            
-            if potential_words:
-                # Try to get details for a few words until one succeeds
+    def fetch_letter(letter):
+        """Finds a word with details for one letter; runs in a worker thread."""
+        with app.app_context():
+            try:
+                # Query Datamuse for words starting with the letter (memoized)
+                potential_words = _datamuse_candidates(letter, level, date.today().toordinal())
+
+                # Prefer a word that came back with an inline definition
+                for word_data in potential_words:
+                    defs = word_data.get('defs')
+                    if defs:
+                        # defs entries look like "n\tdefinition text"
+                        meaning = defs[0].split('\t', 1)[-1]
+                        return {
+                            'word': word_data['word'].capitalize(),
+                            'meaning': meaning,
+                            'example': "No example sentence found.",
+                            'letter': letter,
+                        }
+
+                # No inline definitions at all; fall back to the dictionary API
                 for word_data in potential_words[:5]:
                     details = get_word_details(word_data['word'])
                     if details:
                         details['letter'] = letter
-                        words_list.append(details)
-                        word_found = True
-                        break
-        except requests.exceptions.RequestException as e:
-            print(f"Datamuse API error: {e}")
-
-        if not word_found:
-            # Use fallback if API fails or no valid word is found
+                        return details
+            except requests.exceptions.RequestException as e:
+                print(f"Datamuse API error: {e}")
+
+            # Use fallback if API fails or no valid word is found; mark it so
+            # the route knows this result is degraded
             details = get_word_details(fallback_words[letter])
             if details:
                 details['letter'] = letter
-                words_list.append(details)
+                details['fallback'] = True
+                return details
+            return None
+
+    # Fan out all 26 letters at once; the route is purely network-bound
+    with ThreadPoolExecutor(max_workers=26) as executor:
+        results = list(executor.map(fetch_letter, string.ascii_uppercase))
 
-    return jsonify(words_list)
+    words_list = sorted((r for r in results if r), key=lambda w: w['letter'])
+    degraded = len(words_list) < 26
+    for w in words_list:
+        degraded |= w.pop('fallback', False)
+
+    body = app.json.dumps(words_list)
+    # Never cache a degraded list: during an API outage that would pin an
+    # incomplete (or empty) day-long entry that outlives the outage itself.
+    # Skipping the write keeps degradation per-request, like the fetchers
+    # that let failures raise rather than be cached.
+    if not degraded:
+        cache_set(cache_key, body, 86400)
+    return _words_response(body)
+
+def _words_response(body):
+    """Builds the word-list response from a serialized JSON body."""
+    resp = Response(body, mimetype='application/json')
+    # Word lists barely change within a session; let the browser reuse them
+    resp.headers['Cache-Control'] = 'private, max-age=900'
+    return resp
 
 @app.route('/api/sessions', methods=['POST'])
 def save_session():
@@ -182,12 +358,31 @@ def save_session():
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required.'}), 401
         
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     user_id = session['user_id']
-    
-    database.save_session_data(user_id, data)
-    
-    return jsonify({'message': 'Session saved successfully.'}), 201
+
+    # A 202 promises the save will happen, so reject anything the background
+    # worker couldn't persist before acknowledging it
+    missing = [key for key in ('mode', 'scorePercent', 'words', 'quiz') if key not in data]
+    if missing:
+        return jsonify({'error': f"Missing required fields: {', '.join(missing)}."}), 400
+
+    # The client only needs an acknowledgement; persist in the background
+    # so the quiz-completion response doesn't wait on the commit
+    SAVE_EXECUTOR.submit(_save_session_background, user_id, data)
+
+    return jsonify({'message': 'Session save queued.'}), 202
+
+def _save_session_background(user_id, data):
+    """Persists a session off the request path, then invalidates caches."""
+    with app.app_context():
+        try:
+            database.save_session_data(user_id, data)
+        except Exception as e:
+            print(f"Background session save failed for user {user_id}: {e}")
+            return
+        # The new session changes this user's history and stats
+        cache_delete(f"track:{user_id}", f"sessions:{user_id}")
 
 @app.route('/api/sessions', methods=['GET'])
 def get_sessions():
@@ -196,8 +391,14 @@ def get_sessions():
         return jsonify({'error': 'Authentication required.'}), 401
     
     user_id = session['user_id']
+    cached = cache_get(f"sessions:{user_id}")
+    if cached:
+        return Response(cached, mimetype='application/json')
+
     sessions = database.get_user_sessions(user_id)
-    return jsonify(sessions)
+    body = app.json.dumps(sessions)
+    cache_set(f"sessions:{user_id}", body, 300)
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/sessions/<int:session_id>', methods=['GET'])
 def get_session_detail(session_id):
@@ -208,7 +409,8 @@ def get_session_detail(session_id):
     user_id = session['user_id']
     session_details = database.get_session_details(user_id, session_id)
     if session_details:
-        return jsonify(session_details)
+        # Already a JSON string, assembled by SQLite
+        return Response(session_details, mimetype='application/json')
     return jsonify({'error': 'Session not found or access denied.'}), 404
 
 @app.route('/api/track', methods=['GET'])
@@ -218,8 +420,24 @@ def get_tracking_data():
         return jsonify({'error': 'Authentication required.'}), 401
     
     user_id = session['user_id']
+    cached = cache_get(f"track:{user_id}")
+    if cached:
+        return _conditional_json(cached)
+
     tracking_data = database.get_tracking_stats(user_id)
-    return jsonify(tracking_data)
+    body = app.json.dumps(tracking_data)
+    cache_set(f"track:{user_id}", body, 300)
+    return _conditional_json(body)
+
+def _conditional_json(body):
+    """Builds a JSON response with a short cache window and an ETag, so an
+    unchanged body answers a conditional GET with 304."""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    resp = Response(body, mimetype='application/json')
+    resp.headers['Cache-Control'] = 'private, max-age=60'
+    resp.set_etag(hashlib.md5(body).hexdigest())
+    return resp.make_conditional(request)
 
 if __name__ == '__main__':
     app.run(debug=True)
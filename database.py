@@ -1,21 +1,60 @@
+import os
 import sqlite3
 import json
-from flask import current_app, g
+import threading
+from flask import current_app
+
+# Index DDL, mirrored from schema.sql; safe to re-run so databases created
+# before the indexes existed pick them up on startup
+INDEX_DDL = (
+    'CREATE INDEX IF NOT EXISTS idx_session_user_mode ON session(user_id, mode)',
+    'CREATE INDEX IF NOT EXISTS idx_session_user_date ON session(user_id, date DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_word_session ON word(session_id)',
+    'CREATE INDEX IF NOT EXISTS idx_quiz_session ON quiz(session_id)',
+)
+
+# WAL is persisted in the database file, so switching it once per process
+# is enough; the flag keeps the PRAGMA off the steady-state request path
+_wal_enabled = False
+
+def _tune_connection(db):
+    """Applies performance PRAGMAs to a fresh connection."""
+    global _wal_enabled
+    if not _wal_enabled:
+        # Readers no longer block the save_session_data commit
+        db.execute('PRAGMA journal_mode=WAL')
+        _wal_enabled = True
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.execute('PRAGMA temp_store=MEMORY')
+    db.execute('PRAGMA mmap_size=134217728')
+    db.execute('PRAGMA cache_size=-20000')
+
+# Per-thread connection cache, keyed on pid so a forked worker never reuses
+# a connection inherited from its parent
+_local = threading.local()
 
 def get_db():
-    """Connects to the application's configured database."""
-    if 'db' not in g:
-        g.db = sqlite3.connect(
+    """Returns this thread's connection, creating it on first use."""
+    db = getattr(_local, 'db', None)
+    if db is None or _local.pid != os.getpid():
+        db = sqlite3.connect(
             current_app.config['DATABASE'],
             detect_types=sqlite3.PARSE_DECLTYPES
         )
-        g.db.row_factory = sqlite3.Row
-    return g.db
+        db.row_factory = sqlite3.Row
+        _tune_connection(db)
+        _local.db = db
+        _local.pid = os.getpid()
+    return db
 
 def close_db(e=None):
-    """Closes the database connection."""
-    db = g.pop('db', None)
+    """Teardown hook: connections are reused across requests, so only
+    discard one after an exception, in case it was left in a bad state."""
+    if e is None:
+        return
+    db = getattr(_local, 'db', None)
     if db is not None:
+        _local.db = None
         db.close()
 
 def init_db():
@@ -24,51 +63,96 @@ def init_db():
     with current_app.open_resource('schema.sql') as f:
         db.executescript(f.read().decode('utf8'))
 
-def init_app(app):
-    """Register database functions with the Flask app."""
-    app.teardown_appcontext(close_db)
-    # Check if DB needs to be initialized
-    with app.app_context():
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def ensure_schema():
+    """Runs the schema probe and migrations once per process."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
         db = get_db()
-        cursor = db.cursor()
         try:
-            cursor.execute("SELECT 1 FROM user LIMIT 1")
+            db.execute("SELECT 1 FROM user LIMIT 1")
         except sqlite3.OperationalError:
             # Table doesn't exist, initialize
             init_db()
+        # word_cache was added after the original schema; create it for
+        # databases that were initialized before it existed
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS word_cache ('
+            'word TEXT PRIMARY KEY, meaning TEXT, example TEXT, '
+            'fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)'
+        )
+        for ddl in INDEX_DDL:
+            db.execute(ddl)
+        # words_json/quiz_data were added to session after the original
+        # schema; older rows stay readable via the legacy word/quiz tables
+        for column in ('words_json TEXT', 'quiz_data TEXT'):
+            try:
+                db.execute(f'ALTER TABLE session ADD COLUMN {column}')
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+        db.commit()
+        _schema_ready = True
+
+def init_app(app):
+    """Register database functions with the Flask app."""
+    app.teardown_appcontext(close_db)
+    with app.app_context():
+        ensure_schema()
 
 # --- Data Access Functions ---
 
-def save_session_data(user_id, session_data):
-    """Saves a learning session to the database."""
+def get_cached_word(word):
+    """Returns the cached row for a word, or None on a cache miss.
+
+    Successful lookups are kept for 30 days; failed lookups (meaning IS NULL)
+    only for an hour, so we retry failing words without hammering the API.
+    """
     db = get_db()
-    cursor = db.cursor()
-    cursor.execute(
-        'INSERT INTO session (user_id, mode, score_percent, date) VALUES (?, ?, ?, CURRENT_TIMESTAMP)',
-        (user_id, session_data['mode'], session_data['scorePercent'])
-    )
-    session_id = cursor.lastrowid
-    
-    # Save words
-    words_to_insert = [
-        (session_id, w['letter'], w['word'], w['meaning'], w['example'])
-        for w in session_data['words']
-    ]
-    cursor.executemany(
-        'INSERT INTO word (session_id, letter, word_text, meaning, example) VALUES (?, ?, ?, ?, ?)',
-        words_to_insert
-    )
+    return db.execute(
+        "SELECT meaning, example FROM word_cache WHERE word = ? AND fetched_at > "
+        "datetime('now', CASE WHEN meaning IS NULL THEN '-1 hour' ELSE '-30 days' END)",
+        (word,)
+    ).fetchone()
 
-    # Save quiz
-    # Convert quiz data to JSON string for storage
-    quiz_json = json.dumps(session_data['quiz'])
-    cursor.execute(
-        'INSERT INTO quiz (session_id, quiz_data) VALUES (?, ?)',
-        (session_id, quiz_json)
+def put_cached_word(word, meaning, example):
+    """Stores (or refreshes) a dictionary API result for a word."""
+    db = get_db()
+    db.execute(
+        "INSERT OR REPLACE INTO word_cache (word, meaning, example, fetched_at) "
+        "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+        (word, meaning, example)
     )
-    
     db.commit()
 
+# Statement text as a constant so sqlite3's statement cache can reuse the
+# prepared statement across calls
+_INSERT_SESSION = (
+    'INSERT INTO session (user_id, mode, score_percent, words_json, quiz_data, date) '
+    'VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)'
+)
+
+def save_session_data(user_id, session_data):
+    """Saves a learning session as a single row, words and quiz as JSON."""
+    db = get_db()
+    # Keyed as the legacy word table was, so session details keep their shape
+    words = [
+        {'letter': w['letter'], 'word_text': w['word'], 'meaning': w['meaning'], 'example': w['example']}
+        for w in session_data['words']
+    ]
+    # One explicit transaction: a single fsync on success, rollback on error
+    with db:
+        db.execute(
+            _INSERT_SESSION,
+            (user_id, session_data['mode'], session_data['scorePercent'],
+             json.dumps(words), json.dumps(session_data['quiz']))
+        )
+
 def get_user_sessions(user_id):
     """Retrieves all sessions for a specific user."""
     db = get_db()
@@ -79,46 +163,37 @@ def get_user_sessions(user_id):
     return [dict(row) for row in sessions]
 
 def get_session_details(user_id, session_id):
-    """Retrieves words and quiz for a specific session, ensuring user owns it."""
-    db = get_db()
-    # First, verify ownership
-    session = db.execute(
-        'SELECT * FROM session WHERE id = ? AND user_id = ?', (session_id, user_id)
-    ).fetchone()
+    """Builds the full session-detail JSON for a session the user owns.
 
-    if not session:
-        return None
-
-    words = db.execute(
-        'SELECT letter, word_text, meaning, example FROM word WHERE session_id = ?', (session_id,)
-    ).fetchall()
-    
-    quiz_data = db.execute(
-        'SELECT quiz_data FROM quiz WHERE session_id = ?', (session_id,)
+    Returns the response body as a JSON string (assembled by SQLite's JSON1
+    functions in a single query), or None if the session doesn't exist or
+    belongs to someone else.
+    """
+    db = get_db()
+    row = db.execute(
+        "SELECT json_object("
+        "'id', s.id, 'mode', s.mode, 'scorePercent', s.score_percent, 'dateISO', s.date, "
+        "'words', json(coalesce(s.words_json, (SELECT json_group_array(json_object("
+        "'letter', letter, 'word_text', word_text, 'meaning', meaning, 'example', example)) "
+        "FROM word WHERE session_id = s.id))), "
+        "'quiz', json(coalesce(s.quiz_data, (SELECT quiz_data FROM quiz WHERE session_id = s.id), '[]'))"
+        ") FROM session s WHERE s.id = ? AND s.user_id = ?",
+        (session_id, user_id)
     ).fetchone()
-
-    return {
-        'id': session['id'],
-        'mode': session['mode'],
-        'scorePercent': session['score_percent'],
-        'dateISO': session['date'],
-        'words': [dict(row) for row in words],
-        'quiz': json.loads(quiz_data['quiz_data']) if quiz_data else []
-    }
+    return row[0] if row else None
 
 def get_tracking_stats(user_id):
     """Calculates average scores and test counts for each level."""
     db = get_db()
-    stats = {}
     levels = ['beginner', 'intermediate', 'proficient']
-    for level in levels:
-        result = db.execute(
-            'SELECT AVG(score_percent) as average, COUNT(id) as count FROM session WHERE user_id = ? AND mode = ?',
-            (user_id, level)
-        ).fetchone()
-        
-        stats[level] = {
-            'average': round(result['average']) if result['average'] is not None else 0,
-            'count': result['count'] if result['count'] is not None else 0
-        }
+    # One GROUP BY scan instead of one filtered scan per level
+    rows = db.execute(
+        'SELECT mode, AVG(score_percent) as average, COUNT(id) as count '
+        'FROM session WHERE user_id = ? AND mode IN (?, ?, ?) GROUP BY mode',
+        (user_id, *levels)
+    ).fetchall()
+
+    stats = {level: {'average': 0, 'count': 0} for level in levels}
+    for row in rows:
+        stats[row['mode']] = {'average': round(row['average']), 'count': row['count']}
     return stats
@@ -17,11 +17,13 @@ id INTEGER PRIMARY KEY AUTOINCREMENT,
 user_id INTEGER NOT NULL,
 mode TEXT NOT NULL, -- beginner, intermediate, proficient
 score_percent INTEGER NOT NULL,
+words_json TEXT, -- words for the session as a JSON array
+quiz_data TEXT, -- quiz structure as a JSON string
 date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
 FOREIGN KEY (user_id) REFERENCES user (id)
 );
 
--- Word table to store the words for each session
+-- Legacy word table; sessions saved before words_json existed keep their rows here
 CREATE TABLE word (
 id INTEGER PRIMARY KEY AUTOINCREMENT,
 session_id INTEGER NOT NULL,
@@ -32,10 +34,26 @@ example TEXT,
 FOREIGN KEY (session_id) REFERENCES session (id)
 );
 
--- Quiz table to store the quiz details for each session
+-- Legacy quiz table; sessions saved before session.quiz_data existed keep their rows here
 CREATE TABLE quiz (
 id INTEGER PRIMARY KEY AUTOINCREMENT,
 session_id INTEGER NOT NULL,
 quiz_data TEXT NOT NULL, -- Storing the quiz structure as a JSON string
 FOREIGN KEY (session_id) REFERENCES session (id)
+);
+
+-- Index so per-user, per-mode aggregates are index-only
+CREATE INDEX IF NOT EXISTS idx_session_user_mode ON session(user_id, mode);
+
+-- Indexes for the history and session-detail lookups
+CREATE INDEX IF NOT EXISTS idx_session_user_date ON session(user_id, date DESC);
+CREATE INDEX IF NOT EXISTS idx_word_session ON word(session_id);
+CREATE INDEX IF NOT EXISTS idx_quiz_session ON quiz(session_id);
+
+-- Cache table for dictionary API lookups (meaning IS NULL marks a failed lookup)
+CREATE TABLE word_cache (
+word TEXT PRIMARY KEY,
+meaning TEXT,
+example TEXT,
+fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""Gunicorn entry point.
+
+Run with:
+
+    gunicorn -k gevent -w 4 --worker-connections 1000 wsgi:app
+
+gevent has to monkey-patch the stdlib before app.py imports requests and
+sqlite3, so this module patches first and only then imports the app. Views
+stay synchronous; with patched sockets the outbound API calls in get_words
+yield the greenlet while waiting, so one worker serves many users instead
+of blocking on the 26-letter fan-out.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+from app import app  # noqa: E402  (import must come after monkey.patch_all)